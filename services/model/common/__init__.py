@@ -0,0 +1 @@
+"""Shared helpers for the YOLO inference services"""
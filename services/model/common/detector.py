@@ -0,0 +1,73 @@
+"""
+YOLO detector
+Dispatches inference to the configured engine and converts its output into
+the detection shape the services return.
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+from ultralytics import YOLO
+
+from common.lean_predictor import LeanPredictor
+
+ENGINES = ("ultralytics", "lean")
+
+# (boxes_xyxy, confidences, class_ids) for one image
+DetectionArrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def to_detections(
+    boxes_xyxy: np.ndarray, confidences: np.ndarray, class_ids: np.ndarray, names: Dict[int, str]
+) -> List[Dict]:
+    """Build {"bbox": [x, y, w, h], "class_name", "confidence"} dicts from detection arrays"""
+    boxes_xywh = boxes_xyxy.copy()
+    boxes_xywh[:, 2:] -= boxes_xywh[:, :2]
+
+    return [
+        {"bbox": bbox, "class_name": names.get(cls, "unknown"), "confidence": conf}
+        for bbox, conf, cls in zip(boxes_xywh.tolist(), confidences.tolist(), class_ids.tolist())
+    ]
+
+
+class Detector:
+    """Run a YOLO model through the ultralytics predictor or the lean engine"""
+
+    def __init__(self, model: YOLO, engine: str = "ultralytics", device: str = "cpu"):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown inference engine: {engine} (expected one of {', '.join(ENGINES)})")
+        self.model = model
+        self.engine = engine
+        self.names: Dict[int, str] = model.names
+        self.lean = LeanPredictor(model, device=device) if engine == "lean" else None
+        # Neither engine is safe to call concurrently (shared predictor state / input buffers),
+        # and video streams run in the threadpool alongside requests on the event loop
+        self._lock = threading.Lock()
+
+    def predict_batch(self, images: List[np.ndarray], conf: float = 0.25, iou: float = 0.45) -> List[DetectionArrays]:
+        """Detection arrays per image for a batch of same-shape HWC uint8 images"""
+        with self._lock:
+            if self.lean is not None:
+                return self.lean.predict_batch(images, conf=conf, iou=iou)
+
+            return [
+                (
+                    result.boxes.xyxy.cpu().numpy(),
+                    result.boxes.conf.cpu().numpy(),
+                    result.boxes.cls.cpu().numpy().astype(np.int64),
+                )
+                for result in self.model(images, conf=conf, iou=iou, verbose=False)
+            ]
+
+    def detect_batch(self, images: List[np.ndarray], conf: float = 0.25, iou: float = 0.45) -> List[List[Dict]]:
+        """Detections per image for a batch of same-shape HWC uint8 images"""
+        return [to_detections(*arrays, self.names) for arrays in self.predict_batch(images, conf, iou)]
+
+    def detect(self, img_array: np.ndarray, conf: float = 0.25, iou: float = 0.45) -> List[Dict]:
+        """Detections for a single HWC uint8 image"""
+        return self.detect_batch([img_array], conf, iou)[0]
+
+    def warmup(self, imgsz: int = 640):
+        """Run a dummy inference so the first request doesn't pay for lazy init"""
+        self.predict_batch([np.zeros((imgsz, imgsz, 3), dtype=np.uint8)])
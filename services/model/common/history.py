@@ -0,0 +1,314 @@
+"""
+Detection history store
+Records detections into a local SQLite database from a background writer
+thread, maintaining per-minute, per-hour and per-day rollups so time-bucketed
+counts stay fast regardless of how many raw rows have accumulated.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+
+ROLLUP_RESOLUTIONS = (60, 3600, 86400)
+MAX_BUCKETS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    class_name TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    w REAL NOT NULL,
+    h REAL NOT NULL,
+    latency_ms INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_detections_ts ON detections (ts);
+CREATE INDEX IF NOT EXISTS idx_detections_class_ts ON detections (class_name, ts);
+
+CREATE TABLE IF NOT EXISTS detection_rollups (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    class_name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    PRIMARY KEY (resolution, bucket, source, class_name)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS request_rollups (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    latency_ms_sum INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket, source)
+) WITHOUT ROWID;
+"""
+
+DETECTION_ROLLUP_UPSERT = """
+INSERT INTO detection_rollups (resolution, bucket, source, class_name, count, confidence_sum)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, bucket, source, class_name) DO UPDATE SET
+    count = count + excluded.count,
+    confidence_sum = confidence_sum + excluded.confidence_sum
+"""
+
+REQUEST_ROLLUP_UPSERT = """
+INSERT INTO request_rollups (resolution, bucket, source, requests, latency_ms_sum)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (resolution, bucket, source) DO UPDATE SET
+    requests = requests + excluded.requests,
+    latency_ms_sum = latency_ms_sum + excluded.latency_ms_sum
+"""
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class DetectionHistory:
+    """Queue detections on the request path and write them in batches from a background thread"""
+
+    def __init__(self, path: Path, batch_size: int = 1000, flush_interval: float = 1.0, max_pending: int = 10000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Requests whose detections were discarded because the writer fell behind
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+        conn = _connect(self.path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._reader = _connect(self.path)
+        self._reader_lock = threading.Lock()
+
+        # (timestamp, source, latency_ms, detections) per request
+        self._pending: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="detection-history-writer", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def from_env(cls) -> Optional["DetectionHistory"]:
+        """Enabled by DETECTION_HISTORY_DB (path to the SQLite file)"""
+        path = os.environ.get("DETECTION_HISTORY_DB")
+        if not path:
+            return None
+        print(f"🗃️ Recording detection history to {path}")
+        return cls(Path(path))
+
+    def record(self, source: str, detections: List[Dict], latency_ms: int, timestamp: Optional[float] = None):
+        """Queue one request's {"bbox", "class_name", "confidence"} detections; never blocks the caller"""
+        try:
+            self._pending.put_nowait((timestamp or time.time(), source, latency_ms, detections))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _run(self):
+        conn = _connect(self.path)
+        reported_dropped = 0
+        try:
+            while not self._stop.is_set() or not self._pending.empty():
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self._pending.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                if batch:
+                    try:
+                        self._write(conn, batch)
+                    except sqlite3.Error as e:
+                        print(f"⚠️ Failed to write detection history: {e}")
+
+                dropped = self.dropped
+                if dropped > reported_dropped:
+                    print(
+                        f"⚠️ Detection history queue full: dropped {dropped - reported_dropped} request(s) "
+                        f"({dropped} total)"
+                    )
+                    reported_dropped = dropped
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Tuple]):
+        rows = []
+        detection_rollups: Dict[Tuple[int, int, str, str], List[float]] = {}
+        request_rollups: Dict[Tuple[int, int, str], List[int]] = {}
+
+        for ts, source, latency_ms, detections in batch:
+            for resolution in ROLLUP_RESOLUTIONS:
+                bucket = int(ts // resolution) * resolution
+                totals = request_rollups.setdefault((resolution, bucket, source), [0, 0])
+                totals[0] += 1
+                totals[1] += latency_ms
+
+                for detection in detections:
+                    key = (resolution, bucket, source, detection["class_name"])
+                    totals = detection_rollups.setdefault(key, [0, 0.0])
+                    totals[0] += 1
+                    totals[1] += detection["confidence"]
+
+            for detection in detections:
+                x, y, w, h = detection["bbox"]
+                rows.append((ts, source, detection["class_name"], detection["confidence"], x, y, w, h, latency_ms))
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO detections (ts, source, class_name, confidence, x, y, w, h, latency_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany(DETECTION_ROLLUP_UPSERT, [(*key, *totals) for key, totals in detection_rollups.items()])
+            conn.executemany(REQUEST_ROLLUP_UPSERT, [(*key, *totals) for key, totals in request_rollups.items()])
+
+    def close(self):
+        """Flush pending detections and stop the writer"""
+        self._stop.set()
+        self._writer.join()
+        self._reader.close()
+
+    def counts(
+        self,
+        start: float,
+        end: float,
+        bucket_seconds: int,
+        class_name: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> List[Dict]:
+        """Detection counts per class and request stats per time bucket, served from the rollups"""
+        # Coarsest rollup that evenly divides the requested bucket
+        resolution = max(r for r in ROLLUP_RESOLUTIONS if bucket_seconds % r == 0)
+        start = int(start // bucket_seconds) * bucket_seconds
+        range_params = (bucket_seconds, bucket_seconds, resolution, start, end)
+
+        source_filter = " AND source = ?" if source else ""
+        source_params = (source,) if source else ()
+        class_filter = " AND class_name = ?" if class_name else ""
+        class_params = (class_name,) if class_name else ()
+
+        with self._reader_lock:
+            request_rows = self._reader.execute(
+                "SELECT bucket / ? * ? AS b, SUM(requests), SUM(latency_ms_sum) FROM request_rollups "
+                f"WHERE resolution = ? AND bucket >= ? AND bucket < ?{source_filter} "
+                "GROUP BY b",
+                (*range_params, *source_params),
+            ).fetchall()
+            detection_rows = self._reader.execute(
+                "SELECT bucket / ? * ? AS b, class_name, SUM(count), SUM(confidence_sum) FROM detection_rollups "
+                f"WHERE resolution = ? AND bucket >= ? AND bucket < ?{source_filter}{class_filter} "
+                "GROUP BY b, class_name",
+                (*range_params, *source_params, *class_params),
+            ).fetchall()
+
+        buckets: Dict[int, Dict] = {}
+
+        def get_bucket(b: int) -> Dict:
+            if b not in buckets:
+                buckets[b] = {"start": b, "requests": 0, "avgLatencyMs": 0.0, "total": 0, "classes": {}}
+            return buckets[b]
+
+        for b, requests, latency_sum in request_rows:
+            entry = get_bucket(b)
+            entry["requests"] = requests
+            entry["avgLatencyMs"] = round(latency_sum / requests, 1) if requests else 0.0
+
+        for b, name, count, confidence_sum in detection_rows:
+            entry = get_bucket(b)
+            entry["total"] += count
+            entry["classes"][name] = {"count": count, "avgConfidence": round(confidence_sum / count, 4)}
+
+        return [buckets[b] for b in sorted(buckets)]
+
+    def recent(self, limit: int, class_name: Optional[str] = None, source: Optional[str] = None) -> List[Dict]:
+        """Most recent raw detections, newest first"""
+        filters = ""
+        params: List = []
+        if class_name:
+            filters += " AND class_name = ?"
+            params.append(class_name)
+        if source:
+            filters += " AND source = ?"
+            params.append(source)
+
+        with self._reader_lock:
+            rows = self._reader.execute(
+                "SELECT ts, source, class_name, confidence, x, y, w, h, latency_ms FROM detections "
+                f"WHERE 1 = 1{filters} ORDER BY ts DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+
+        return [
+            {
+                "timestamp": ts,
+                "source": row_source,
+                "class_name": name,
+                "confidence": confidence,
+                "bbox": [x, y, w, h],
+                "latencyMs": latency_ms,
+            }
+            for ts, row_source, name, confidence, x, y, w, h, latency_ms in rows
+        ]
+
+
+def create_history_router(history: DetectionHistory) -> APIRouter:
+    """Query endpoints over the detection history"""
+    router = APIRouter(prefix="/history")
+
+    # Plain def handlers run in the threadpool, so SQLite queries never block the event loop
+
+    @router.get("/counts")
+    def history_counts(
+        start: Optional[float] = Query(None, description="Epoch seconds, defaults to 24 hours before end"),
+        end: Optional[float] = Query(None, description="Epoch seconds, defaults to now"),
+        bucket: int = Query(3600, ge=60, description="Bucket size in seconds, a multiple of 60"),
+        class_name: Optional[str] = None,
+        source: Optional[str] = None,
+    ):
+        """Time-bucketed detection counts"""
+        if bucket % 60:
+            raise HTTPException(status_code=400, detail="bucket must be a multiple of 60 seconds")
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - 24 * 3600
+        if start >= end:
+            raise HTTPException(status_code=400, detail="start must be before end")
+        if (end - start) / bucket > MAX_BUCKETS:
+            raise HTTPException(status_code=400, detail=f"Range spans more than {MAX_BUCKETS} buckets")
+
+        return {
+            "start": start,
+            "end": end,
+            "bucketSeconds": bucket,
+            "droppedRequests": history.dropped,
+            "buckets": history.counts(start, end, bucket, class_name, source),
+        }
+
+    @router.get("/detections")
+    def history_detections(
+        limit: int = Query(100, ge=1, le=1000),
+        class_name: Optional[str] = None,
+        source: Optional[str] = None,
+    ):
+        """Most recent detections"""
+        return {"detections": history.recent(limit, class_name, source)}
+
+    return router
@@ -0,0 +1,188 @@
+"""
+Lean YOLO predictor
+Calls the underlying detection nn.Module directly, skipping the ultralytics
+Predictor / Results machinery on the hot path.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+import cv2
+import numpy as np
+import torch
+import torchvision
+from ultralytics import YOLO
+
+# Same defaults as ultralytics.utils.nms.non_max_suppression
+MAX_DET = 300
+MAX_NMS = 30000
+MAX_WH = 7680
+PAD_VALUE = 114
+
+# Padded input shapes are stride multiples up to imgsz; keep buffers for the most recent few
+MAX_BUFFER_SHAPES = 4
+
+
+class _Letterbox(NamedTuple):
+    """Letterbox geometry for one source image shape"""
+
+    orig_shape: Tuple[int, int]
+    new_unpad: Tuple[int, int]
+    padded_shape: Tuple[int, int]
+    top: int
+    left: int
+    gain: Tuple[float, float]
+
+
+@lru_cache(maxsize=256)
+def _letterbox(h0: int, w0: int, imgsz: int, stride: int) -> _Letterbox:
+    r = min(imgsz / h0, imgsz / w0)
+    new_w, new_h = round(w0 * r), round(h0 * r)
+
+    # Minimum rectangle padding, as the ultralytics predictor does for .pt models
+    dw, dh = (imgsz - new_w) % stride / 2, (imgsz - new_h) % stride / 2
+    top, left = round(dh - 0.1), round(dw - 0.1)
+    height = new_h + top + round(dh + 0.1)
+    width = new_w + left + round(dw + 0.1)
+
+    return _Letterbox((h0, w0), (new_w, new_h), (height, width), top, left, (new_w / w0, new_h / h0))
+
+
+class _InputBuffers:
+    """Preallocated letterbox and input tensor buffers for one padded input shape"""
+
+    def __init__(self, shape: Tuple[int, int], device: torch.device, capacity: int):
+        height, width = shape
+        self.capacity = capacity
+        self.padded = np.full((height, width, 3), PAD_VALUE, dtype=np.uint8)
+        self.host = np.empty((capacity, 3, height, width), dtype=np.float32)
+        host_tensor = torch.from_numpy(self.host)
+        if device.type == "cuda":
+            self.host_tensor = host_tensor.pin_memory()
+            self.host = self.host_tensor.numpy()
+            self.input = torch.empty_like(self.host_tensor, device=device)
+        else:
+            self.host_tensor = host_tensor
+            self.input = host_tensor
+
+
+class LeanPredictor:
+    """Run a YOLO detection model without the ultralytics Predictor overhead"""
+
+    def __init__(self, yolo: YOLO, device: str = "cpu", imgsz: int = 640):
+        self.device = torch.device(device)
+        self.imgsz = imgsz
+        self.names: Dict[int, str] = yolo.names
+
+        module = yolo.model
+        if getattr(module, "end2end", False):
+            raise ValueError("End-to-end (NMS-free) models are not supported by the lean engine")
+
+        module = module.fuse(verbose=False) if hasattr(module, "fuse") else module
+        self.module = module.to(self.device).eval()
+        for param in self.module.parameters():
+            param.requires_grad_(False)
+
+        self.stride = max(int(self.module.stride.max()), 32)
+        self._buffers: "OrderedDict[Tuple[int, int], _InputBuffers]" = OrderedDict()
+
+    def _get_buffers(self, shape: Tuple[int, int], batch_size: int) -> _InputBuffers:
+        buffers = self._buffers.get(shape)
+        if buffers is None or buffers.capacity < batch_size:
+            buffers = _InputBuffers(shape, self.device, batch_size)
+            self._buffers[shape] = buffers
+            while len(self._buffers) > MAX_BUFFER_SHAPES:
+                self._buffers.popitem(last=False)
+        self._buffers.move_to_end(shape)
+        return buffers
+
+    def preprocess(self, images: List[np.ndarray]) -> Tuple[torch.Tensor, _Letterbox]:
+        """Letterbox and normalize same-shape images into the preallocated input tensor"""
+        h0, w0 = images[0].shape[:2]
+        geometry = _letterbox(h0, w0, self.imgsz, self.stride)
+        buffers = self._get_buffers(geometry.padded_shape, len(images))
+        new_w, new_h = geometry.new_unpad
+        top, left = geometry.top, geometry.left
+
+        # Buffers are shared by every source shape with the same padded shape, so reset the border
+        padded = buffers.padded
+        padded[:top] = PAD_VALUE
+        padded[top + new_h:] = PAD_VALUE
+        padded[top:top + new_h, :left] = PAD_VALUE
+        padded[top:top + new_h, left + new_w:] = PAD_VALUE
+
+        for i, img_array in enumerate(images):
+            if img_array.shape[:2] != geometry.orig_shape:
+                raise ValueError("All images in a batch must have the same shape")
+            if (img_array.shape[1], img_array.shape[0]) != geometry.new_unpad:
+                img_array = cv2.resize(img_array, geometry.new_unpad, interpolation=cv2.INTER_LINEAR)
+            padded[top:top + new_h, left:left + new_w] = img_array
+
+            # HWC -> CHW with the channel flip the ultralytics predictor applies, then 0-255 -> 0.0-1.0
+            np.divide(padded.transpose(2, 0, 1)[::-1], np.float32(255), out=buffers.host[i])
+
+        n = len(images)
+        if buffers.input is not buffers.host_tensor:
+            buffers.input[:n].copy_(buffers.host_tensor[:n], non_blocking=True)
+        return buffers.input[:n], geometry
+
+    def postprocess(
+        self,
+        preds: torch.Tensor,
+        geometry: _Letterbox,
+        conf: float,
+        iou: float,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Confidence filter, class-aware NMS and rescale back to the source image"""
+        x = preds.transpose(0, 1)  # (4 + nc, N) -> (N, 4 + nc)
+        scores, class_ids = x[:, 4:].max(1)
+        keep = scores > conf
+        boxes, scores, class_ids = x[keep, :4], scores[keep], class_ids[keep]
+
+        if boxes.shape[0] > MAX_NMS:
+            top = scores.argsort(descending=True)[:MAX_NMS]
+            boxes, scores, class_ids = boxes[top], scores[top], class_ids[top]
+
+        # xywh -> xyxy
+        half = boxes[:, 2:] / 2
+        boxes = torch.cat((boxes[:, :2] - half, boxes[:, :2] + half), 1)
+
+        offsets = class_ids[:, None].to(boxes.dtype) * MAX_WH
+        keep = torchvision.ops.nms(boxes + offsets, scores, iou)[:MAX_DET]
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        # Undo letterbox and clip to the source image
+        gain_x, gain_y = geometry.gain
+        h0, w0 = geometry.orig_shape
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - geometry.left) / gain_x).clamp_(0, w0)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - geometry.top) / gain_y).clamp_(0, h0)
+
+        return (
+            boxes.cpu().numpy(),
+            scores.cpu().numpy(),
+            class_ids.cpu().numpy().astype(np.int64),
+        )
+
+    @torch.inference_mode()
+    def predict_batch(
+        self,
+        images: List[np.ndarray],
+        conf: float = 0.25,
+        iou: float = 0.45,
+    ) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Return (boxes_xyxy, confidences, class_ids) per image for same-shape HWC uint8 images"""
+        im, geometry = self.preprocess(images)
+        preds = self.module(im)
+        if isinstance(preds, (list, tuple)):
+            preds = preds[0]
+        return [self.postprocess(pred, geometry, conf, iou) for pred in preds]
+
+    def __call__(
+        self,
+        img_array: np.ndarray,
+        conf: float = 0.25,
+        iou: float = 0.45,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (boxes_xyxy, confidences, class_ids) for a single HWC uint8 image"""
+        return self.predict_batch([img_array], conf, iou)[0]
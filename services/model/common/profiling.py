@@ -0,0 +1,271 @@
+"""
+On-demand profiling captures
+Records the torch operator profiler and sampled Python stacks for the next N
+requests or T seconds, then serves the result as a downloadable archive.
+"""
+
+import json
+import os
+import secrets
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import torch
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent.parent / "profiles"
+
+
+class StackSampler(threading.Thread):
+    """Periodically sample the Python stacks of all other threads"""
+
+    def __init__(self, interval: float, deadline: float, on_deadline):
+        super().__init__(name="profiling-stack-sampler", daemon=True)
+        self.interval = interval
+        self.deadline = deadline
+        self.on_deadline = on_deadline
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+            if time.monotonic() >= self.deadline:
+                self.on_deadline()
+                return
+
+    def stop(self):
+        self._stop_event.set()
+        if threading.current_thread() is not self:
+            self.join()
+
+    def write_folded(self, path: Path):
+        """Write collapsed stacks, loadable by flamegraph.pl and speedscope"""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingCapture:
+    """State of one capture window"""
+
+    def __init__(
+        self,
+        output_dir: Path,
+        max_requests: Optional[int],
+        seconds: Optional[float],
+        sample_interval: float,
+        on_finish: Callable[["ProfilingCapture"], None],
+    ):
+        self.id = time.strftime("%Y%m%d-%H%M%S") + "-" + secrets.token_hex(3)
+        self.dir = output_dir / self.id
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_requests = max_requests
+        self.seconds = seconds
+        self.started_at = time.time()
+        self.requests_captured = 0
+        self.requests_skipped = 0
+        self.finished = False
+        self.summaries: List[str] = []
+        # Guards finished, summaries and trace files against finish() racing in-flight requests
+        self.lock = threading.Lock()
+        self.sampler = StackSampler(
+            sample_interval,
+            time.monotonic() + seconds if seconds else float("inf"),
+            lambda: on_finish(self),
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "finished": self.finished,
+            "requestsCaptured": self.requests_captured,
+            "requestsSkipped": self.requests_skipped,
+            "maxRequests": self.max_requests,
+            "seconds": self.seconds,
+            "startedAt": self.started_at,
+            "stackSamples": self.sampler.samples,
+        }
+
+
+class Profiler:
+    """Arm captures and wrap request handling; a disarmed profiler costs one attribute check"""
+
+    def __init__(self, output_dir: Path = DEFAULT_OUTPUT_DIR):
+        self.output_dir = Path(output_dir)
+        self.active: Optional[ProfilingCapture] = None
+        self._lock = threading.Lock()
+        self._request_count = 0
+        # The torch profiler supports a single session per process; held while one request is profiled
+        self._session_lock = threading.Lock()
+
+    def start(self, max_requests: Optional[int], seconds: Optional[float], sample_interval: float) -> ProfilingCapture:
+        with self._lock:
+            if self.active is not None:
+                raise HTTPException(status_code=409, detail=f"Capture {self.active.id} is already running")
+            capture = ProfilingCapture(self.output_dir, max_requests, seconds, sample_interval, self.finish)
+            self.active = capture
+        capture.sampler.start()
+        print(f"🔬 Profiling capture {capture.id} started")
+        return capture
+
+    def finish(self, capture: ProfilingCapture):
+        """Close the capture and write its output on a background thread"""
+        with self._lock:
+            if self.active is capture:
+                self.active = None
+        # Waits for any request still writing its trace into the capture
+        with capture.lock:
+            if capture.finished:
+                return
+            capture.finished = True
+
+        # Joining the sampler and archiving up to 1000 traces must not run on the event loop
+        threading.Thread(target=self._write_output, args=(capture,), name="profiling-writer").start()
+
+    def _write_output(self, capture: ProfilingCapture):
+        capture.sampler.stop()
+        capture.sampler.write_folded(capture.dir / "python-stacks.folded")
+        (capture.dir / "torch-ops.txt").write_text("\n\n".join(capture.summaries))
+        (capture.dir / "capture.json").write_text(json.dumps(capture.to_dict(), indent=2))
+
+        # Build the archive elsewhere and move it in, so downloads never see a partial zip
+        staging_dir = self.output_dir / ".staging"
+        staging_dir.mkdir(exist_ok=True)
+        archive = shutil.make_archive(str(staging_dir / capture.id), "zip", capture.dir)
+        os.replace(archive, self.output_dir / f"{capture.id}.zip")
+        print(f"🔬 Profiling capture {capture.id} written to {capture.dir}")
+
+    @contextmanager
+    def capture(self, name: str):
+        """Profile the wrapped request if a capture is armed"""
+        capture = self.active
+        if capture is None:
+            yield
+            return
+
+        # Requests overlapping one that is being profiled run unprofiled rather than queueing
+        if not self._session_lock.acquire(blocking=False):
+            with capture.lock:
+                capture.requests_skipped += 1
+            yield
+            return
+
+        try:
+            with self._lock:
+                self._request_count += 1
+                index = self._request_count
+
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+            with torch.profiler.profile(activities=activities) as prof:
+                yield
+
+            with capture.lock:
+                if capture.finished:
+                    return
+                prof.export_chrome_trace(str(capture.dir / f"{index:04d}-{name}.trace.json"))
+                capture.summaries.append(
+                    f"# {index:04d} {name}\n"
+                    + prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=25)
+                )
+                capture.requests_captured += 1
+                done = bool(capture.max_requests and capture.requests_captured >= capture.max_requests)
+        finally:
+            self._session_lock.release()
+
+        if done:
+            self.finish(capture)
+
+
+class ProfilingStartRequest(BaseModel):
+    requests: Optional[int] = Field(default=None, ge=1, le=1000)
+    seconds: Optional[float] = Field(default=None, gt=0, le=600)
+    sampleIntervalMs: float = Field(default=5.0, ge=1, le=1000)
+
+
+class ProfilingStatusResponse(BaseModel):
+    active: Optional[Dict]
+    captures: List[str]
+
+
+def require_admin(token: Optional[str]):
+    """Check the admin token; profiling is disabled when PROFILING_ADMIN_TOKEN is unset"""
+    expected = os.environ.get("PROFILING_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not token or not secrets.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def create_profiling_router(profiler: Profiler) -> APIRouter:
+    """Admin endpoints to arm captures and download their output"""
+    router = APIRouter(prefix="/admin/profiling")
+
+    @router.post("", response_model=Dict)
+    async def start_profiling(request: ProfilingStartRequest, x_admin_token: Optional[str] = Header(None)):
+        """Profile the next N requests and/or T seconds"""
+        require_admin(x_admin_token)
+        max_requests = request.requests
+        if max_requests is None and request.seconds is None:
+            max_requests = 10
+        capture = profiler.start(max_requests, request.seconds, request.sampleIntervalMs / 1000)
+        return capture.to_dict()
+
+    @router.get("", response_model=ProfilingStatusResponse)
+    async def profiling_status(x_admin_token: Optional[str] = Header(None)):
+        """Active capture and finished captures available for download"""
+        require_admin(x_admin_token)
+        active = profiler.active
+        captures = sorted(p.stem for p in profiler.output_dir.glob("*.zip")) if profiler.output_dir.exists() else []
+        return ProfilingStatusResponse(
+            active=active.to_dict() if active else None,
+            captures=captures,
+        )
+
+    @router.delete("", response_model=Dict)
+    async def stop_profiling(x_admin_token: Optional[str] = Header(None)):
+        """Stop the active capture early and write its output"""
+        require_admin(x_admin_token)
+        capture = profiler.active
+        if capture is None:
+            raise HTTPException(status_code=404, detail="No capture is running")
+        # finish() waits for a request that may be exporting its trace; keep that off the event loop
+        await run_in_threadpool(profiler.finish, capture)
+        return capture.to_dict()
+
+    @router.get("/{capture_id}")
+    async def download_capture(capture_id: str, x_admin_token: Optional[str] = Header(None)):
+        """Download a finished capture as a zip archive"""
+        require_admin(x_admin_token)
+        archive = profiler.output_dir / f"{Path(capture_id).name}.zip"
+        if not archive.exists():
+            raise HTTPException(status_code=404, detail=f"Capture {capture_id} not found or still running")
+        return FileResponse(archive, media_type="application/zip", filename=archive.name)
+
+    return router
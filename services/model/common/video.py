@@ -0,0 +1,152 @@
+"""
+Video detection pipeline
+Decodes a video file with OpenCV in a background thread, batches frames and
+runs detection on each batch, yielding one record per processed frame followed
+by a throughput summary. Memory stays bounded by the prefetch queue.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+# (frame index, timestamp in ms, RGB frame)
+Frame = Tuple[int, float, np.ndarray]
+DetectBatch = Callable[[List[np.ndarray]], List[List[Dict]]]
+
+_END = object()
+
+
+def iter_frames(cap: cv2.VideoCapture, stride: int = 1) -> Iterator[Frame]:
+    """Yield every `stride`-th frame; skipped frames are grabbed but not decoded to RGB"""
+    index = 0
+    while True:
+        if index % stride:
+            if not cap.grab():
+                return
+        else:
+            ok, frame = cap.read()
+            if not ok:
+                return
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC)
+            # Match the RGB frames the /inference endpoint decodes
+            yield index, timestamp, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        index += 1
+
+
+def iter_batches(frames: Iterator[Frame], batch_size: int) -> Iterator[List[Frame]]:
+    batch: List[Frame] = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prefetch(items: Iterator, depth: int) -> Iterator:
+    """Produce items in a background thread, at most `depth` ahead of the consumer"""
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_END)
+        except Exception as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name="video-decode", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Consumer finished or went away (e.g. client disconnected): unblock the producer
+        stop.set()
+        producer.join()
+
+
+def open_video(video_path: str) -> cv2.VideoCapture:
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Failed to open video")
+    return cap
+
+
+def stream_video_detections(
+    cap: cv2.VideoCapture,
+    detect_batch: DetectBatch,
+    stride: int = 1,
+    batch_size: int = 8,
+    prefetch_batches: int = 2,
+) -> Iterator[Dict]:
+    """Yield {"frame", "timestampMs", "detections"} per processed frame, then {"summary": ...}
+
+    Releases the capture when the stream ends or is closed.
+    """
+    batches = None
+    try:
+        video_fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        start_time = time.time()
+        inference_time = 0.0
+        processed = 0
+
+        batches = prefetch(iter_batches(iter_frames(cap, stride), batch_size), prefetch_batches)
+        for batch in batches:
+            batch_start = time.time()
+            results = detect_batch([frame for _, _, frame in batch])
+            inference_time += time.time() - batch_start
+
+            for (index, timestamp, _), detections in zip(batch, results):
+                yield {
+                    "frame": index,
+                    "timestampMs": round(timestamp, 1),
+                    "detections": detections,
+                }
+            processed += len(batch)
+
+        elapsed = time.time() - start_time
+        yield {
+            "summary": {
+                "framesProcessed": processed,
+                "videoFrames": total_frames,
+                "stride": stride,
+                "batchSize": batch_size,
+                "videoFps": round(video_fps, 2),
+                "videoWidth": width,
+                "videoHeight": height,
+                "elapsedMs": int(elapsed * 1000),
+                "inferenceMs": int(inference_time * 1000),
+                "fps": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+            }
+        }
+    finally:
+        # Stop the decode thread before releasing the capture it reads from
+        if batches is not None:
+            batches.close()
+        cap.release()
@@ -1,5 +1,8 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import torch
 import cv2
@@ -9,9 +12,22 @@ import base64
 from io import BytesIO
 from PIL import Image
 import time
+import json
+import tempfile
+import contextlib
 from typing import List, Dict, Optional
+import os
+import atexit
+import sys
+from pathlib import Path
 import subprocess
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.detector import Detector
+from common.history import DetectionHistory, create_history_router
+from common.profiling import Profiler, create_profiling_router
+from common.video import open_video, stream_video_detections
+
 app = FastAPI(title="YOLO Inference Service")
 
 # CORS middleware
@@ -23,10 +39,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admin-only on-demand profiling (enabled by PROFILING_ADMIN_TOKEN)
+profiler = Profiler()
+app.include_router(create_profiling_router(profiler))
+
+# Optional detection history store (enabled by DETECTION_HISTORY_DB)
+history = DetectionHistory.from_env()
+if history is not None:
+    app.include_router(create_history_router(history))
+    atexit.register(history.close)
+
 # Global variables
 model: Optional[YOLO] = None
+detector: Optional[Detector] = None
 gpu_info: Optional[Dict] = None
 
+# "ultralytics" (default) or "lean" to call the nn.Module directly
+INFERENCE_ENGINE = os.environ.get("YOLO_ENGINE", "ultralytics").lower()
+
 
 class InferenceRequest(BaseModel):
     image: str  # base64 encoded image
@@ -91,7 +121,7 @@ def detect_gpu() -> Dict:
 
 def initialize_model():
     """Initialize YOLO model with GPU support"""
-    global model
+    global model, detector
     if model:
         return model
 
@@ -111,6 +141,10 @@ def initialize_model():
             model.to("cpu")
             print("✅ Model loaded on CPU")
         
+        detector = Detector(model, INFERENCE_ENGINE, device="cuda" if gpu["cudaAvailable"] else "cpu")
+        if INFERENCE_ENGINE == "lean":
+            print("⚡ Using lean inference engine")
+        
         return model
     except Exception as e:
         print(f"❌ Error loading model: {e}")
@@ -141,6 +175,17 @@ def preprocess_image(base64_image: str) -> np.ndarray:
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to preprocess image: {str(e)}")
 
+
+def run_inference(base64_image: str) -> List[Dict]:
+    """Decode and detect in a worker thread; the model lock may be held by a video stream"""
+    with profiler.capture("inference"):
+        # Preprocess image
+        img_array = preprocess_image(base64_image)
+        
+        # Run inference
+        return detector.detect(img_array)
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
@@ -155,40 +200,11 @@ async def inference(request: InferenceRequest):
         if model is None:
             initialize_model()
         
-        # Preprocess image
-        img_array = preprocess_image(request.image)
-        
-        # Run inference
-        results = model(img_array, conf=0.25, iou=0.45, verbose=False)
-        
-        # Process detections
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get box coordinates (xyxy format)
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                
-                # Convert to xywh format
-                x = float(x1)
-                y = float(y1)
-                w = float(x2 - x1)
-                h = float(y2 - y1)
-                
-                # Get class and confidence
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                class_name = result.names[cls] if cls < len(result.names) else "unknown"
-                
-                detections.append(
-                    Detection(
-                        bbox=[x, y, w, h],
-                        class_name=class_name,
-                        confidence=conf,
-                    )
-                )
+        detections = await run_in_threadpool(run_inference, request.image)
         
         inference_time = int((time.time() - start_time) * 1000)
+        if history is not None:
+            history.record("inference", detections, inference_time)
         
         return InferenceResponse(
             detections=detections,
@@ -220,6 +236,64 @@ async def health_check():
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
 
 
+@app.post("/inference/video")
+async def inference_video(
+    request: Request,
+    stride: int = Query(1, ge=1, description="Process every Nth frame"),
+    batch: int = Query(8, ge=1, le=64, description="Frames per inference batch"),
+):
+    """Run YOLO on a raw video file body and stream per-frame detections as NDJSON"""
+    if model is None:
+        initialize_model()
+
+    # OpenCV needs a file path, so spool the upload to disk without holding it in memory
+    video_file = tempfile.NamedTemporaryFile(suffix=".video", delete=False)
+    try:
+        with video_file:
+            async for chunk in request.stream():
+                await run_in_threadpool(video_file.write, chunk)
+        cap = open_video(video_file.name)
+    except ValueError as e:
+        os.unlink(video_file.name)
+        raise HTTPException(status_code=400, detail=f"Failed to read video: {str(e)}")
+    except BaseException:
+        # Client disconnected mid-upload, disk full, cancelled...
+        os.unlink(video_file.name)
+        raise
+
+    def detect_batch(frames: List[np.ndarray]) -> List[List[Dict]]:
+        batch_start = time.time()
+        results = detector.detect_batch(frames)
+        frame_time = int((time.time() - batch_start) * 1000 / len(frames))
+        if history is not None:
+            for detections in results:
+                history.record("video", detections, frame_time)
+        return results
+
+    records = stream_video_detections(cap, detect_batch, stride=stride, batch_size=batch)
+
+    def cleanup():
+        """Stop decoding, release the capture and remove the spooled file; safe to call twice"""
+        records.close()
+        cap.release()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(video_file.name)
+
+    def generate():
+        try:
+            for record in records:
+                yield json.dumps(record) + "\n"
+        except Exception as e:
+            print(f"❌ Video inference error: {e}")
+            yield json.dumps({"error": f"Video inference failed: {str(e)}"}) + "\n"
+        finally:
+            cleanup()
+
+    # Clean up after the response even if the stream never starts; if Starlette skips the
+    # background task on a disconnect, the generator's finally still runs when it is closed
+    return StreamingResponse(generate(), media_type="application/x-ndjson", background=BackgroundTask(cleanup))
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -236,8 +310,7 @@ if __name__ == "__main__":
     
     # Warm up model with dummy inference
     try:
-        dummy_img = np.zeros((640, 640, 3), dtype=np.uint8)
-        model(dummy_img, verbose=False)
+        detector.warmup()
         print("✅ Model warmed up and ready")
     except Exception as e:
         print(f"⚠️ Model warmup failed: {e}")
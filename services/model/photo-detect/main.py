@@ -10,6 +10,15 @@ from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
 import time
 from typing import List, Dict, Optional
+import os
+import atexit
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.detector import Detector
+from common.history import DetectionHistory, create_history_router
+from common.profiling import Profiler, create_profiling_router
 
 app = FastAPI(title="YOLO Photo Detection Service")
 
@@ -22,10 +31,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admin-only on-demand profiling (enabled by PROFILING_ADMIN_TOKEN)
+profiler = Profiler()
+app.include_router(create_profiling_router(profiler))
+
+# Optional detection history store (enabled by DETECTION_HISTORY_DB)
+history = DetectionHistory.from_env()
+if history is not None:
+    app.include_router(create_history_router(history))
+    atexit.register(history.close)
+
 # Global variables
 model: Optional[YOLO] = None
+detector: Optional[Detector] = None
 gpu_info: Optional[Dict] = None
 
+# "ultralytics" (default) or "lean" to call the nn.Module directly
+INFERENCE_ENGINE = os.environ.get("YOLO_ENGINE", "ultralytics").lower()
+
 
 class PhotoDetectRequest(BaseModel):
     image: str  # base64 encoded image
@@ -91,7 +114,7 @@ def detect_gpu() -> Dict:
 
 def initialize_model():
     """Initialize YOLO model with GPU support"""
-    global model
+    global model, detector
     if model:
         return model
 
@@ -111,6 +134,10 @@ def initialize_model():
             model.to("cpu")
             print("✅ Model loaded on CPU")
         
+        detector = Detector(model, INFERENCE_ENGINE, device="cuda" if gpu["cudaAvailable"] else "cpu")
+        if INFERENCE_ENGINE == "lean":
+            print("⚡ Using lean inference engine")
+        
         return model
     except Exception as e:
         print(f"❌ Error loading model: {e}")
@@ -142,13 +169,13 @@ def preprocess_image(base64_image: str) -> np.ndarray:
         raise HTTPException(status_code=400, detail=f"Failed to preprocess image: {str(e)}")
 
 
-def draw_detections_on_image(img_array: np.ndarray, detections: List[Detection]) -> np.ndarray:
+def draw_detections_on_image(img_array: np.ndarray, detections: List[Dict]) -> np.ndarray:
     """Draw bounding boxes and labels on image using OpenCV for speed"""
     # Work on a copy
     img = img_array.copy()
     
     for detection in detections:
-        x, y, w, h = detection.bbox
+        x, y, w, h = detection["bbox"]
         x1, y1 = int(x), int(y)
         x2, y2 = int(x + w), int(y + h)
         
@@ -156,7 +183,7 @@ def draw_detections_on_image(img_array: np.ndarray, detections: List[Detection])
         cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
         
         # Prepare label
-        label = f"{detection.class_name} {detection.confidence * 100:.1f}%"
+        label = f"{detection['class_name']} {detection['confidence'] * 100:.1f}%"
         
         # Get text size
         (text_width, text_height), baseline = cv2.getTextSize(
@@ -200,51 +227,27 @@ async def photo_detect(request: PhotoDetectRequest):
         if model is None:
             initialize_model()
         
-        # Preprocess image
-        img_array = preprocess_image(request.image)
-        
-        # Run inference
-        results = model(img_array, conf=0.25, iou=0.45, verbose=False)
-        
-        # Process detections
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get box coordinates (xyxy format)
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                
-                # Convert to xywh format
-                x = float(x1)
-                y = float(y1)
-                w = float(x2 - x1)
-                h = float(y2 - y1)
-                
-                # Get class and confidence
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                class_name = result.names[cls] if cls < len(result.names) else "unknown"
-                
-                detections.append(
-                    Detection(
-                        bbox=[x, y, w, h],
-                        class_name=class_name,
-                        confidence=conf,
-                    )
-                )
-        
-        # Draw detections on image
-        annotated_img_array = draw_detections_on_image(img_array, detections)
-        
-        # Convert BGR back to RGB for encoding
-        annotated_img_rgb = cv2.cvtColor(annotated_img_array, cv2.COLOR_RGB2BGR)
-        
-        # Encode to JPEG
-        _, buffer = cv2.imencode('.jpg', annotated_img_rgb, [cv2.IMWRITE_JPEG_QUALITY, 90])
-        annotated_base64 = base64.b64encode(buffer).decode()
-        annotated_image_str = f"data:image/jpeg;base64,{annotated_base64}"
+        with profiler.capture("photo-detect"):
+            # Preprocess image
+            img_array = preprocess_image(request.image)
+            
+            # Run inference
+            detections = detector.detect(img_array)
+            
+            # Draw detections on image
+            annotated_img_array = draw_detections_on_image(img_array, detections)
+            
+            # Convert BGR back to RGB for encoding
+            annotated_img_rgb = cv2.cvtColor(annotated_img_array, cv2.COLOR_RGB2BGR)
+            
+            # Encode to JPEG
+            _, buffer = cv2.imencode('.jpg', annotated_img_rgb, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            annotated_base64 = base64.b64encode(buffer).decode()
+            annotated_image_str = f"data:image/jpeg;base64,{annotated_base64}"
         
         inference_time = int((time.time() - start_time) * 1000)
+        if history is not None:
+            history.record("photo-detect", detections, inference_time)
         
         return PhotoDetectResponse(
             detections=detections,
@@ -293,8 +296,7 @@ if __name__ == "__main__":
     
     # Warm up model with dummy inference
     try:
-        dummy_img = np.zeros((640, 640, 3), dtype=np.uint8)
-        model(dummy_img, verbose=False)
+        detector.warmup()
         print("✅ Model warmed up and ready")
     except Exception as e:
         print(f"⚠️ Model warmup failed: {e}")
@@ -0,0 +1,115 @@
+"""
+Lean engine parity check
+Runs the ultralytics predictor and the lean predictor on the same images and
+verifies they return the same detections.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from ultralytics import YOLO
+from ultralytics.utils import ASSETS
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.lean_predictor import LeanPredictor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Check lean engine parity against the ultralytics predictor')
+    parser.add_argument('--model', type=str, default='../../../public/models/yolo11n.pt', help='Path to .pt model')
+    parser.add_argument('--images', type=str, default=None, help='Directory of images (bundled ultralytics samples if omitted)')
+    parser.add_argument('--conf', type=float, default=0.25, help='Confidence threshold')
+    parser.add_argument('--iou', type=float, default=0.45, help='NMS IoU threshold')
+    parser.add_argument('--device', type=str, default='cuda' if torch.cuda.is_available() else 'cpu')
+    parser.add_argument('--box-tol', type=float, default=0.5, help='Max allowed box difference in pixels')
+    parser.add_argument('--conf-tol', type=float, default=1e-3, help='Max allowed confidence difference')
+    return parser.parse_args()
+
+
+def load_images(images_dir):
+    """Yield (name, RGB image) pairs the same way the services decode them"""
+    if images_dir is None:
+        # Real scenes, so a trained model returns detections; resized to cover several letterbox shapes
+        for path in sorted(ASSETS.glob('*.jpg')):
+            img = cv2.cvtColor(cv2.imread(str(path), cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+            yield path.name, img
+            for width, height in [(640, 480), (1280, 720), (500, 300)]:
+                yield f'{path.name} {width}x{height}', cv2.resize(img, (width, height))
+        return
+
+    for path in sorted(Path(images_dir).iterdir()):
+        img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if img is not None:
+            yield path.name, cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def compare(reference, lean, box_tol, conf_tol):
+    """Return a mismatch description, or None if both outputs agree"""
+    ref_boxes, ref_conf, ref_cls = reference
+    lean_boxes, lean_conf, lean_cls = lean
+
+    if len(ref_boxes) != len(lean_boxes):
+        return f'detection count {len(ref_boxes)} != {len(lean_boxes)}'
+    if len(ref_boxes) == 0:
+        return None
+    if not np.array_equal(ref_cls, lean_cls):
+        return 'class ids differ'
+
+    box_diff = float(np.abs(ref_boxes - lean_boxes).max())
+    conf_diff = float(np.abs(ref_conf - lean_conf).max())
+    if box_diff > box_tol:
+        return f'max box difference {box_diff:.4f}px'
+    if conf_diff > conf_tol:
+        return f'max confidence difference {conf_diff:.6f}'
+    return None
+
+
+def main():
+    args = parse_args()
+
+    model_path = Path(args.model).absolute()
+    if not model_path.exists():
+        print(f"❌ Error: Model file not found at {model_path}")
+        sys.exit(1)
+
+    model = YOLO(str(model_path))
+    model.to(args.device)
+    lean = LeanPredictor(model, device=args.device)
+
+    failures = 0
+    compared = 0
+    for name, img in load_images(args.images):
+        boxes = model(img, conf=args.conf, iou=args.iou, verbose=False)[0].boxes
+        reference = (
+            boxes.xyxy.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy().astype(np.int64),
+        )
+        mismatch = compare(reference, lean(img, conf=args.conf, iou=args.iou), args.box_tol, args.conf_tol)
+        if mismatch is None:
+            # The batched path shares one input buffer across images
+            for arrays in lean.predict_batch([img, img], conf=args.conf, iou=args.iou):
+                mismatch = mismatch or compare(reference, arrays, args.box_tol, args.conf_tol)
+
+        if mismatch:
+            failures += 1
+            print(f"❌ {name}: {mismatch}")
+        else:
+            compared += len(reference[0])
+            print(f"✅ {name}: {len(reference[0])} detections match")
+
+    if failures:
+        print(f"\n❌ {failures} image(s) differ between engines")
+        sys.exit(1)
+    if compared == 0:
+        print("\n❌ No detections were compared; use images the model detects objects in or lower --conf")
+        sys.exit(1)
+    print("\n🎉 Lean engine matches the ultralytics predictor")
+
+
+if __name__ == '__main__':
+    main()
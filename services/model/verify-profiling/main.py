@@ -0,0 +1,100 @@
+"""
+Profiling concurrency check
+Arms a profiling capture and runs detection from several threads at once, the
+way the services handle overlapping requests, then verifies the capture
+finished and every request was either profiled or skipped.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import torch
+from ultralytics import YOLO
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.detector import ENGINES, Detector
+from common.profiling import Profiler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Check that concurrent requests can run under a profiling capture')
+    parser.add_argument('--model', type=str, default='../../../public/models/yolo11n.pt', help='Path to .pt model')
+    parser.add_argument('--engine', choices=ENGINES, default='ultralytics', help='Inference engine')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent requests per round')
+    parser.add_argument('--rounds', type=int, default=3, help='Rounds of concurrent requests')
+    parser.add_argument('--device', type=str, default='cuda' if torch.cuda.is_available() else 'cpu')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    model_path = Path(args.model).absolute()
+    if not model_path.exists():
+        print(f"❌ Error: Model file not found at {model_path}")
+        sys.exit(1)
+
+    model = YOLO(str(model_path))
+    model.to(args.device)
+    detector = Detector(model, args.engine, device=args.device)
+    detector.warmup()
+
+    img = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    total = args.threads * args.rounds
+    errors = []
+
+    def request(barrier: threading.Barrier):
+        barrier.wait()
+        try:
+            with profiler.capture("verify"):
+                detector.detect(img)
+        except Exception as e:
+            errors.append(e)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        profiler = Profiler(Path(output_dir))
+        # Never reached, so the capture stays armed for every round
+        capture = profiler.start(total + 1, None, 0.005)
+
+        for _ in range(args.rounds):
+            barrier = threading.Barrier(args.threads)
+            threads = [threading.Thread(target=request, args=(barrier,)) for _ in range(args.threads)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        profiler.finish(capture)
+        archive = Path(output_dir) / f"{capture.id}.zip"
+        deadline = time.monotonic() + 30
+        while not archive.exists() and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        if errors:
+            print(f"❌ {len(errors)} request(s) failed: {errors[0]}")
+            sys.exit(1)
+        if not archive.exists():
+            print("❌ Capture archive was not written")
+            sys.exit(1)
+
+        with zipfile.ZipFile(archive) as zf:
+            meta = json.loads(zf.read("capture.json"))
+            traces = [name for name in zf.namelist() if name.endswith(".trace.json")]
+
+    captured, skipped = meta["requestsCaptured"], meta["requestsSkipped"]
+    print(f"🔬 {total} requests: {captured} profiled, {skipped} skipped, {len(traces)} traces")
+    if captured == 0 or captured + skipped != total or len(traces) != captured:
+        print("❌ Capture does not account for every request")
+        sys.exit(1)
+    print("\n🎉 Concurrent requests run safely under a profiling capture")
+
+
+if __name__ == '__main__':
+    main()
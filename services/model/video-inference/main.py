@@ -0,0 +1,79 @@
+"""
+Video Inference CLI
+Runs YOLO over a video file and writes per-frame detections as NDJSON
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import torch
+from ultralytics import YOLO
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.detector import Detector
+from common.video import open_video, stream_video_detections
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run YOLO on a video file and stream detections as NDJSON')
+    parser.add_argument('video', type=str, help='Path to video file')
+    parser.add_argument('--model', type=str, default='../../../public/models/yolo11n.pt', help='Path to .pt model')
+    parser.add_argument('--output', type=str, default='-', help='NDJSON output file ("-" for stdout)')
+    parser.add_argument('--stride', type=int, default=1, help='Process every Nth frame')
+    parser.add_argument('--batch', type=int, default=8, help='Frames per inference batch')
+    parser.add_argument('--prefetch', type=int, default=2, help='Decoded batches to buffer ahead of the model')
+    parser.add_argument('--engine', choices=['ultralytics', 'lean'], default='ultralytics', help='Inference engine')
+    parser.add_argument('--conf', type=float, default=0.25, help='Confidence threshold')
+    parser.add_argument('--iou', type=float, default=0.45, help='NMS IoU threshold')
+    parser.add_argument('--device', type=str, default='cuda' if torch.cuda.is_available() else 'cpu')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.stride < 1 or args.batch < 1 or args.prefetch < 1:
+        print("❌ --stride, --batch and --prefetch must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    model_path = Path(args.model).absolute()
+    if not model_path.exists():
+        print(f"❌ Error: Model file not found at {model_path}", file=sys.stderr)
+        sys.exit(1)
+
+    model = YOLO(str(model_path))
+    model.to(args.device)
+    detector = Detector(model, args.engine, device=args.device)
+
+    def detect_batch(frames):
+        return detector.detect_batch(frames, conf=args.conf, iou=args.iou)
+
+    try:
+        cap = open_video(args.video)
+    except ValueError as e:
+        print(f"❌ {e}: {args.video}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"🎬 Processing {args.video} with {args.engine} engine on {args.device}", file=sys.stderr)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        records = stream_video_detections(
+            cap, detect_batch, stride=args.stride, batch_size=args.batch, prefetch_batches=args.prefetch
+        )
+        for record in records:
+            output.write(json.dumps(record) + "\n")
+            if "summary" in record:
+                summary = record["summary"]
+                print(
+                    f"✅ {summary['framesProcessed']} frames in {summary['elapsedMs']} ms ({summary['fps']} FPS)",
+                    file=sys.stderr,
+                )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()